@@ -1,32 +1,102 @@
+import asyncio
 import os
-from fastapi import FastAPI
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from dotenv import load_dotenv
-from pymongo import MongoClient
-from sentence_transformers import SentenceTransformer
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from encoder import load_encoder, tune_torch_threads
 
 load_dotenv()
-client = MongoClient(os.getenv("MONGODB_URI"))
+client = AsyncIOMotorClient(os.getenv("MONGODB_URI"))
 col    = client.slang_db.slang_terms
-model  = SentenceTransformer("all-MiniLM-L6-v2")
 
-app = FastAPI(title="Evolving Language Tracker")
+# Dynamic batching knobs: coalesce queries that arrive within MAX_WAIT
+# seconds into one forward pass of up to MAX_BATCH terms.
+MAX_BATCH = 32
+MAX_WAIT  = 0.005
+
+async def submit_encode(state, term: str):
+    """Queue a term for the batch worker and wait for its embedding."""
+    future = asyncio.get_running_loop().create_future()
+    await state.encode_queue.put((term, future))
+    return await future
+
+async def batch_encode_worker(state):
+    """Pop queued terms, encode them as one batch, and fan results back out."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await state.encode_queue.get()]
+        deadline = loop.time() + MAX_WAIT
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(state.encode_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        terms = [term for term, _ in batch]
+        try:
+            embeddings = await loop.run_in_executor(
+                state.executor,
+                lambda: state.model.encode(
+                    terms, batch_size=MAX_BATCH,
+                    convert_to_numpy=True, normalize_embeddings=True
+                )
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the model once per worker process instead of at import time, and
+    # warm it up so the first real request doesn't pay the lazy-init cost.
+    # Scale with `uvicorn --workers N` (each worker holds its own ~90MB copy);
+    # set OMP_NUM_THREADS=1 per worker to avoid thread oversubscription.
+    # Only tune torch threads when the worker count is actually known;
+    # `uvicorn --workers N` doesn't set WEB_CONCURRENCY, and defaulting to
+    # workers=1 would call set_num_threads(cpu_count) in every worker,
+    # overriding an operator's OMP_NUM_THREADS=1 and making things worse.
+    web_concurrency = os.getenv("WEB_CONCURRENCY")
+    if web_concurrency:
+        tune_torch_threads(workers=int(web_concurrency))
+    app.state.model = load_encoder()
+    app.state.model.encode("warmup")
+    # encode() is CPU-bound, so run it in a pool instead of on the event loop.
+    app.state.executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+    app.state.encode_queue = asyncio.Queue()
+    batcher = asyncio.create_task(batch_encode_worker(app.state))
+    yield
+    batcher.cancel()
+    app.state.executor.shutdown(wait=False)
+
+app = FastAPI(title="Evolving Language Tracker", lifespan=lifespan)
 
 @app.get("/search")
-async def search(term: str, k: int = 5):
-    q_emb = model.encode(term).tolist()
+async def search(request: Request, term: str, k: int = 5):
+    q_emb = await submit_encode(request.app.state, term)
     pipeline = [
         {
             "$search": {
                 "vector": {
                     "path": "embedding",
-                    "queryVector": q_emb,
+                    "queryVector": q_emb.tolist(),
                     "k": k
                 }
             }
         },
         {"$limit": k}
     ]
-    hits = list(col.aggregate(pipeline))
+    hits = await col.aggregate(pipeline).to_list(k)
     return [
         {"term": h["term"], "year": h["year"], "examples": h["examples"]}
         for h in hits
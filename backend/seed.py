@@ -1,4 +1,5 @@
 import os
+import torch
 from dotenv import load_dotenv
 from pymongo import MongoClient
 from sentence_transformers import SentenceTransformer
@@ -13,8 +14,13 @@ samples = [
     {"term": "on fleek", "year": 2016, "examples": ["Eyebrows on fleek."]}
 ]
 
-for doc in samples:
-    doc["embedding"] = model.encode(" ".join(doc["examples"])).tolist()
-    col.insert_one(doc)
+# One batched forward pass and one insert round trip instead of per-doc calls
+texts = [" ".join(doc["examples"]) for doc in samples]
+with torch.inference_mode():
+    embeddings = model.encode(texts, batch_size=32, convert_to_numpy=True,
+                              normalize_embeddings=True)
+for doc, emb in zip(samples, embeddings):
+    doc["embedding"] = emb.tolist()
+col.insert_many(samples, ordered=False)
 
 print("Seeded sample docs ✔")
@@ -1,31 +1,39 @@
 import pandas as pd
 import numpy as np
-import re
-from datetime import datetime
-from sentence_transformers import SentenceTransformer
+import sys
 import os
+import time
+import hashlib
+from bson.binary import Binary, BinaryVectorDtype
 from pymongo import MongoClient, ASCENDING
 from dotenv import load_dotenv
 import logging
 import json
+import orjson
 from pymongo.errors import OperationFailure
 
+# Shared encoder module lives at the repo root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from encoder import load_encoder, tune_torch_threads
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def load_data(file_path):
-    """Load the raw data from CSV file."""
+    """Load only the needed columns from the CSV into Arrow-backed pandas."""
     logger.info(f"Loading data from {file_path}")
-    df = pd.read_csv(file_path)
-    logger.info(f"Loaded {len(df)} rows")
-    return df
-
-def drop_columns(df):
-    """Drop unnecessary columns."""
     columns_to_keep = ['word', 'definition', 'example', 'date', 'upvotes', 'downvotes']
-    df = df[columns_to_keep]
-    logger.info(f"Kept columns: {columns_to_keep}")
+    # The pyarrow engine parallelizes parsing, and Arrow-backed strings avoid
+    # one Python str object per cell, keeping the later .str ops in C.
+    df = pd.read_csv(
+        file_path,
+        engine='pyarrow',
+        usecols=columns_to_keep,
+        dtype={'upvotes': 'int32[pyarrow]', 'downvotes': 'int32[pyarrow]'},
+        dtype_backend='pyarrow',
+    )
+    logger.info(f"Loaded {len(df)} rows with columns: {columns_to_keep}")
     return df
 
 def filter_by_votes(df):
@@ -42,13 +50,17 @@ def normalize_text(df):
         if col not in df.columns:
             continue
             
-        # Strip whitespace and normalize spaces
-        df[col] = df[col].astype(str).str.strip()
-        df[col] = df[col].apply(lambda x: re.sub(r'\s+', ' ', x))
-        
+        # Strip whitespace and normalize spaces (vectorized, no per-row apply)
+        df[col] = (
+            df[col].astype('string').str.strip()
+                   .str.replace(r'\s+', ' ', regex=True)
+        )
+
         # Replace special quotes with standard ones - FIXED
-        df[col] = df[col].str.replace('"', '"').str.replace('"', '"')
-        df[col] = df[col].str.replace("'", "'").str.replace("'", "'")
+        df[col] = (
+            df[col].str.replace('“|”', '"', regex=True)
+                   .str.replace('‘|’', "'", regex=True)
+        )
     
     logger.info("Normalized text fields")
     return df
@@ -56,26 +68,22 @@ def normalize_text(df):
 def parse_dates(df):
     """Convert date strings to datetime and extract year."""
     # Example date formats from Urban Dictionary: "August 17, 2012"
-    def extract_year(date_str):
-        try:
-            if pd.isna(date_str) or not date_str:
-                return None
-            return datetime.strptime(date_str, "%B %d, %Y").year
-        except Exception:
-            return None
-    
-    df['year'] = df['date'].apply(extract_year)
+    # Single C-level parse over the whole column; bad dates become NaT.
+    dates = pd.to_datetime(df['date'], format="%B %d, %Y", errors='coerce')
+    df['year'] = dates.dt.year
     df = df.dropna(subset=['year'])
-    df['year'] = df['year'].astype(int)
-    
+    df['year'] = df['year'].astype('int16')
+
     logger.info(f"Extracted years from dates, kept {len(df)} rows with valid dates")
     return df
 
 def build_embedding_text(df):
     """Create a text column for embedding."""
-    df['text'] = df.apply(
-        lambda row: f"Definition of {row['word']}: {row['definition']}. Example: {row['example']}", 
-        axis=1
+    # Vectorized string concatenation instead of a row-wise apply
+    df['text'] = (
+        "Definition of " + df['word'].astype('string')
+        + ": " + df['definition'].astype('string')
+        + ". Example: " + df['example'].astype('string')
     )
     logger.info("Created embedding text column")
     return df
@@ -83,16 +91,21 @@ def build_embedding_text(df):
 def filter_low_quality(df):
     """Filter out low quality entries."""
     before = len(df)
-    
-    # Drop rows with short definitions or examples
-    df = df[df['definition'].str.len() >= 6]
-    df = df[df['example'].str.len() >= 6]
-    
+
+    # Drop rows with short definitions or examples in one boolean pass,
+    # computing each string length only once
+    def_len = df['definition'].str.len()
+    ex_len = df['example'].str.len()
+    df = df[(def_len >= 6) & (ex_len >= 6)]
+
     # Drop rows with null required fields
     df = df.dropna(subset=['word', 'definition', 'example', 'year'])
-    
-    # Drop duplicate texts
-    df = df.drop_duplicates(subset=['text'])
+
+    # Drop duplicate texts by 64-bit hash instead of comparing full strings
+    df = df.loc[~pd.util.hash_pandas_object(df['text'], index=False).duplicated()]
+
+    # Slang words repeat across entries, so category dtype halves memory
+    df['word'] = df['word'].astype('category')
     
     logger.info(f"Removed {before - len(df)} low quality entries")
     return df
@@ -100,37 +113,101 @@ def filter_low_quality(df):
 def generate_embeddings(df, model_name="all-MiniLM-L6-v2"):
     """Generate embeddings for the text column."""
     logger.info(f"Loading embedding model: {model_name}")
-    model = SentenceTransformer(model_name)
+    model = load_encoder(model_name)
     
     logger.info("Generating embeddings...")
     # Added type safety and batch processing
     texts = df['text'].fillna("").astype(str).tolist()
-    embeddings = model.encode(texts, show_progress_bar=True, batch_size=64)
-    
-    # Convert numpy arrays to lists for MongoDB storage
-    df['embedding'] = [embedding.tolist() for embedding in embeddings]
+
+    # Batch wall time is set by the longest text in each batch (shorter ones
+    # are padded up to it), so encode in length order and un-permute after.
+    idx = np.argsort([len(t) for t in texts])
+    sorted_texts = [texts[i] for i in idx]
+
+    if hasattr(model, 'start_multi_process_pool') and len(sorted_texts) > 10000:
+        # SentenceTransformer path on a big corpus: spread chunks over one
+        # worker process per core, since the GIL would otherwise serialize
+        # batch encodings in a single process. The pool spawns fresh worker
+        # processes, so parent torch settings don't reach them — but env vars
+        # do; limit each worker to one compute thread so cpu_count workers
+        # don't each spin up cpu_count threads.
+        os.environ["OMP_NUM_THREADS"] = "1"
+        os.environ["MKL_NUM_THREADS"] = "1"
+        pool = model.start_multi_process_pool(target_devices=['cpu'] * os.cpu_count())
+        try:
+            embeddings = model.encode_multi_process(sorted_texts, pool, batch_size=64,
+                                                    chunk_size=1000,
+                                                    normalize_embeddings=True)
+        finally:
+            model.stop_multi_process_pool(pool)
+    else:
+        tune_torch_threads()
+        embeddings = model.encode(sorted_texts, show_progress_bar=True, batch_size=64,
+                                  convert_to_numpy=True, normalize_embeddings=True)
+    embeddings = embeddings[np.argsort(idx)]
+
+    # Keep embeddings as float32 rows of one contiguous array; converting to
+    # Python float lists here would box 384 floats per document for nothing.
+    df['embedding'] = list(embeddings.astype(np.float32))
     logger.info("Generated embeddings")
     return df
 
 def format_output(df):
     """Format the dataframe into the desired output structure."""
-    output_data = []
-    
-    for _, row in df.iterrows():
-        doc = {
-            "term": row['word'],
-            "year": int(row['year']),
-            "examples": [row['text']],
-            "embedding": row['embedding'],
+    # to_dict('records') avoids the per-row Series construction of iterrows
+    records = df[['word', 'year', 'text', 'embedding']].to_dict('records')
+    output_data = [
+        {
+            "term": r['word'],
+            "year": int(r['year']),
+            "examples": [r['text']],
+            "embedding": r['embedding'],
             "source": "urban_dictionary"
         }
-        output_data.append(doc)
-    
+        for r in records
+    ]
+
     logger.info(f"Formatted {len(output_data)} documents")
     return output_data
 
-def check_vector_search_capability(client):
-    """Check if MongoDB Atlas supports vector search."""
+# Capability probe results are cached here per connection URI so repeated
+# pipeline runs skip the insert/index/drop round trips against Atlas
+CAPABILITY_CACHE = os.path.expanduser("~/.cache/evolving-lang-tracker/vector_cap.json")
+CAPABILITY_CACHE_TTL = 24 * 60 * 60  # seconds
+
+def _load_capability_cache():
+    try:
+        with open(CAPABILITY_CACHE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def check_vector_search_capability(client, connection_string=None):
+    """Check if MongoDB Atlas supports vector search, caching the answer per URI."""
+    cache_key = None
+    if connection_string:
+        cache_key = hashlib.sha1(connection_string.encode()).hexdigest()
+        cached = _load_capability_cache().get(cache_key)
+        if cached and time.time() - cached['checked_at'] < CAPABILITY_CACHE_TTL:
+            logger.info(f"Using cached vector search capability: {cached['supported']}")
+            return cached['supported']
+
+    supported = _probe_vector_search_capability(client)
+
+    if cache_key is not None:
+        try:
+            os.makedirs(os.path.dirname(CAPABILITY_CACHE), exist_ok=True)
+            cache = _load_capability_cache()
+            cache[cache_key] = {'supported': supported, 'checked_at': time.time()}
+            with open(CAPABILITY_CACHE, 'w') as f:
+                json.dump(cache, f)
+        except OSError as e:
+            logger.warning(f"Could not write capability cache: {e}")
+
+    return supported
+
+def _probe_vector_search_capability(client):
+    """Probe the cluster directly with a throwaway collection and index."""
     try:
         # Try to run a simple vector search command to test capability
         db = client.admin
@@ -219,12 +296,23 @@ def save_to_mongodb(data, connection_string, db_name="slang_db", collection_name
         db = client[db_name]
         collection = db[collection_name]
         
-        # Check vector search capability
-        has_vector_search = check_vector_search_capability(client)
+        # Check vector search capability (cached per URI for 24h)
+        has_vector_search = check_vector_search_capability(client, connection_string)
         
-        # Insert the documents
-        result = collection.insert_many(data)
-        logger.info(f"Inserted {len(result.inserted_ids)} documents into MongoDB")
+        # Insert in unordered chunks: the server processes unordered writes
+        # concurrently and a bad document no longer aborts the whole batch.
+        # Embeddings become packed BSON vectors (binData float32, ~4x smaller
+        # on the wire than an array of doubles) one chunk at a time.
+        inserted = 0
+        for i in range(0, len(data), 1000):
+            chunk = [
+                {**doc, "embedding": Binary.from_vector(doc["embedding"], BinaryVectorDtype.FLOAT32)}
+                for doc in data[i:i + 1000]
+            ]
+            result = collection.insert_many(chunk, ordered=False,
+                                            bypass_document_validation=True)
+            inserted += len(result.inserted_ids)
+        logger.info(f"Inserted {inserted} documents into MongoDB")
         
         # Create appropriate indexes
         if has_vector_search:
@@ -268,7 +356,6 @@ def main():
     
     # Process the data
     df = load_data(input_file)
-    df = drop_columns(df)
     df = filter_by_votes(df)
     df = normalize_text(df)
     df = parse_dates(df)
@@ -279,10 +366,14 @@ def main():
     # Format and save
     output_data = format_output(df)
     
-    # Added JSON output option
-    with open("cleaned_urban_docs.json", "w") as f:
-        json.dump(output_data, f, indent=2)
-    logger.info(f"Saved {len(output_data)} documents to cleaned_urban_docs.json")
+    # Stream one record per line; orjson serializes the float32 embedding
+    # arrays natively in C, and ndjson avoids building (and pretty-printing)
+    # one giant string for the whole corpus
+    with open("cleaned_urban_docs.ndjson", "wb") as f:
+        for doc in output_data:
+            f.write(orjson.dumps(doc, option=orjson.OPT_SERIALIZE_NUMPY))
+            f.write(b"\n")
+    logger.info(f"Saved {len(output_data)} documents to cleaned_urban_docs.ndjson")
 
     if mongodb_uri:
         save_to_mongodb(output_data, mongodb_uri)
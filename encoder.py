@@ -0,0 +1,156 @@
+"""
+Quantized ONNX encoder for all-MiniLM-L6-v2.
+
+MiniLM in FP32 PyTorch is the hot path for both /search latency and the
+cleaning pipeline's embedding step. Exporting once to ONNX and running the
+int8-quantized graph through onnxruntime (VNNI int8 GEMM on modern CPUs)
+gives ~2-4x throughput with negligible cosine drift.
+
+Run `python encoder.py` once to export and quantize the model into onnx/;
+`load_encoder()` falls back to plain SentenceTransformer if that hasn't
+been done (or onnxruntime isn't installed).
+"""
+
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+ONNX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx")
+QUANTIZED_MODEL = os.path.join(ONNX_DIR, "model_quantized.onnx")
+
+def export_quantized_model(model_name=MODEL_NAME, onnx_dir=ONNX_DIR):
+    """Export MiniLM to ONNX and int8-quantize the weights (one-time setup)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+
+    model_id = f"sentence-transformers/{model_name}"
+    logger.info(f"Exporting {model_id} to ONNX in {onnx_dir}")
+    ort_model = ORTModelForFeatureExtraction.from_pretrained(model_id, export=True)
+    ort_model.save_pretrained(onnx_dir)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(onnx_dir)
+
+    quantize_dynamic(
+        os.path.join(onnx_dir, "model.onnx"),
+        QUANTIZED_MODEL,
+        weight_type=QuantType.QInt8,
+    )
+    logger.info(f"Saved int8 model to {QUANTIZED_MODEL}")
+
+class OnnxEncoder:
+    """Drop-in replacement for SentenceTransformer.encode on the int8 ONNX graph."""
+
+    def __init__(self, onnx_dir=ONNX_DIR):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+        self.session = onnxruntime.InferenceSession(
+            QUANTIZED_MODEL, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=True,
+               convert_to_numpy=True, show_progress_bar=False):
+        """Encode a string or list of strings to float32 embeddings.
+
+        Accepts the SentenceTransformer.encode keywords the pipeline uses;
+        output is always numpy, show_progress_bar is ignored.
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        if not sentences:
+            # Match SentenceTransformer.encode([]) instead of letting
+            # np.concatenate blow up on an empty list
+            return np.empty((0, 384), dtype=np.float32)
+
+        embeddings = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            tokens = self.tokenizer(batch, padding=True, truncation=True,
+                                    max_length=256, return_tensors="np")
+            inputs = {name: tokens[name] for name in self.input_names if name in tokens}
+            hidden = self.session.run(None, inputs)[0]
+            # Mean-pool over non-padding tokens, same as the SentenceTransformer head.
+            mask = tokens["attention_mask"][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings.append(pooled)
+
+        embeddings = np.concatenate(embeddings).astype(np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.clip(norms, 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+class TorchEncoder:
+    """Wrap a SentenceTransformer so .encode runs under torch.inference_mode.
+
+    inference_mode is a stronger no-grad than no_grad: it skips autograd
+    bookkeeping and tensor version counter bumps entirely. Everything else
+    (encode_multi_process, the pool helpers, ...) is delegated untouched.
+    """
+
+    def __init__(self, model):
+        self._model = model
+
+    def encode(self, *args, **kwargs):
+        import torch
+        with torch.inference_mode():
+            return self._model.encode(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+def tune_torch_threads(workers=1):
+    """Split compute threads across worker processes to avoid oversubscription.
+
+    With `workers` processes doing inference on one machine, each should get
+    cpu_count // workers intra-op threads and a single inter-op thread,
+    otherwise the thread pools fight each other for cores.
+    """
+    try:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // max(1, workers)))
+        torch.set_num_interop_threads(1)
+    except Exception as e:
+        # set_num_interop_threads raises if parallel work already started
+        logger.debug(f"Could not tune torch threads: {e}")
+
+def load_encoder(model_name=MODEL_NAME):
+    """Return the quantized ONNX encoder, or SentenceTransformer as fallback."""
+    try:
+        encoder = OnnxEncoder()
+        logger.info("Loaded int8 ONNX encoder")
+        return encoder
+    except Exception as e:
+        logger.warning(f"ONNX encoder unavailable ({e}); falling back to SentenceTransformer")
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        # TF32 matmuls are free accuracy-wise at this precision and faster on
+        # Ampere+ GPUs; a no-op on CPU.
+        torch.set_float32_matmul_precision('high')
+        model = SentenceTransformer(model_name)
+        model.eval()
+        try:
+            # Fuse attention into the single-kernel SDPA/FlashAttention path.
+            # MiniLM inference at these sequence lengths is memory-bound, so
+            # cutting the intermediate reads/writes is a straight speedup.
+            from optimum.bettertransformer import BetterTransformer
+            first = model._first_module()
+            first.auto_model = BetterTransformer.transform(first.auto_model)
+            logger.info("Applied BetterTransformer fused attention")
+        except Exception as bt_err:
+            # Recent transformers already default to SDPA attention, where
+            # BetterTransformer is deprecated and refuses to transform.
+            logger.info(f"BetterTransformer not applied ({bt_err}); using stock attention")
+        return TorchEncoder(model)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    export_quantized_model()